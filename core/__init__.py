@@ -4,28 +4,34 @@ Utilities for validation and API upload
 
 from .validators import CSVValidator
 from .api_client import APIClient
-from .user_custom_validators import validate_roles, validate_date_of_joining, validate_date_of_birth, validate_boundary
+from .user_custom_validators import (
+    validate_roles, validate_date_of_joining, validate_date_of_birth, validate_boundary,
+    validate_roles_column, validate_date_of_joining_column, validate_date_of_birth_column
+)
+import csv
+import functools
 import os
-import pandas as pd
 import json
 
 _DIR = os.path.dirname(__file__)
 
 
+@functools.lru_cache(maxsize=1)
 def create_user_validator():
-    """Set up a CSVValidator with roles, boundaries, and custom field checks."""
+    """
+    Set up a CSVValidator with roles, boundaries, and custom field checks.
+    The templates are only read once; later calls return the same validator.
+    """
     with open(os.path.join(_DIR, "templates", "rolesmapping.json"), 'r') as f:
         roles_map = json.load(f)
 
-    boundary_df = pd.read_csv(os.path.join(_DIR, "templates", "boundary_template.csv"))
-    boundaries = {
-        str(row["id"]).strip(): str(row["name"]).strip()
-        for _, row in boundary_df.iterrows()
-    }
+    with open(os.path.join(_DIR, "templates", "boundary_template.csv"), newline='', encoding='utf-8') as f:
+        boundaries = {row["id"].strip(): row["name"].strip() for row in csv.DictReader(f)}
 
     reference_data = {
         "roles": roles_map,
-        "boundaries": boundaries
+        "boundaries": boundaries,
+        "boundary_names": frozenset(boundaries.values())
     }
 
     custom_validators = {
@@ -35,10 +41,17 @@ def create_user_validator():
         "boundary_code": validate_boundary
     }
 
+    column_validators = {
+        "roles": validate_roles_column,
+        "date_of_joining": validate_date_of_joining_column,
+        "date_of_birth": validate_date_of_birth_column
+    }
+
     return CSVValidator(
         schema_path=os.path.join(_DIR, "config", "user_validation_mdms_schema.json"),
         reference_data=reference_data,
-        custom_validators=custom_validators
+        custom_validators=custom_validators,
+        column_validators=column_validators
     )
 
 
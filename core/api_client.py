@@ -2,103 +2,162 @@
 API client for DHIS2 user ingestion
 """
 
+import re
 import requests
 import json
+from contextlib import nullcontext
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Longest API message kept in the result CSV
+MAX_MESSAGE_LENGTH = 4096
+
+
+def _truncate_message(text):
+    if len(text) <= MAX_MESSAGE_LENGTH:
+        return text
+    return text[:MAX_MESSAGE_LENGTH] + "... [truncated]"
+
+
+def _json_loads(text):
+    return orjson.loads(text) if orjson else json.loads(text)
+
+
+def _json_dumps(obj):
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+# Static part of the system user sent with every ingestion request;
+# the tenant-specific keys are filled in per client
+_USER_INFO_TEMPLATE = {
+    "id": 97,
+    "userName": "ab-prd",
+    "salutation": None,
+    "name": "System User",
+    "gender": None,
+    "mobileNumber": "9999999999",
+    "emailId": None,
+    "altContactNumber": None,
+    "pan": None,
+    "aadhaarNumber": None,
+    "permanentAddress": None,
+    "permanentCity": None,
+    "permanentPinCode": None,
+    "correspondenceAddress": None,
+    "correspondenceCity": None,
+    "correspondencePinCode": None,
+    "alternatemobilenumber": None,
+    "active": True,
+    "locale": None,
+    "type": "EMPLOYEE",
+    "accountLocked": False,
+    "accountLockedDate": 0,
+    "fatherOrHusbandName": None,
+    "relationship": None,
+    "signature": None,
+    "bloodGroup": None,
+    "photo": None,
+    "identificationMark": None,
+    "createdBy": 23287,
+    "lastModifiedBy": 23287,
+    "tenantId": None,
+    "roles": None,
+    "uuid": None,
+    "createdDate": None,
+    "lastModifiedDate": None,
+    "dob": None,
+    "pwdExpiryDate": None
+}
 
 
 class APIClient:
     """Handles uploading user CSV files to the DHIS2 ingestion endpoint."""
 
+    # Error snippets that mean the user is already registered
+    _EXISTS_RE = re.compile(
+        r"already exists|already exist|duplicate|user exists|username already|"
+        r"conflict|err_hrms_user_exist|user_exist_mob",
+        re.IGNORECASE
+    )
+
+    _SUCCESS_JOB_STATES = frozenset({"Completed", "Success"})
+
+    _ROLE_TEMPLATES = (
+        ("SUPERVISOR", "Supervisor"),
+        ("DISTRICT_SUPERVISOR", "District Supervisor"),
+        ("SYSTEM_ADMINISTRATOR", "System Administrator"),
+        ("SUPERUSER", "Super User"),
+        ("NATIONAL_SUPERVISOR", "National Supervisor"),
+        ("DISTRIBUTOR", "Distributor"),
+        ("WAREHOUSE_MANAGER", "Warehouse Manager"),
+        ("REGISTRAR", "Registrar"),
+        ("PROVINCIAL_SUPERVISOR", "Provincial Supervisor"),
+    )
+
     def __init__(self, api_url, tenant_id="bi", auth_token=None):
         self.api_url = api_url
         self.tenant_id = tenant_id
         self.auth_token = auth_token or "ee36fdd7-64e7-4583-9c16-998479ff53c0"
+        now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
 
         self.user_info = {
-            "id": 97,
-            "userName": "ab-prd",
-            "salutation": None,
-            "name": "System User",
-            "gender": None,
-            "mobileNumber": "9999999999",
-            "emailId": None,
-            "altContactNumber": None,
-            "pan": None,
-            "aadhaarNumber": None,
-            "permanentAddress": None,
-            "permanentCity": None,
-            "permanentPinCode": None,
-            "correspondenceAddress": None,
-            "correspondenceCity": None,
-            "correspondencePinCode": None,
-            "alternatemobilenumber": None,
-            "active": True,
-            "locale": None,
-            "type": "EMPLOYEE",
-            "accountLocked": False,
-            "accountLockedDate": 0,
-            "fatherOrHusbandName": None,
-            "relationship": None,
-            "signature": None,
-            "bloodGroup": None,
-            "photo": None,
-            "identificationMark": None,
-            "createdBy": 23287,
-            "lastModifiedBy": 23287,
+            **_USER_INFO_TEMPLATE,
             "tenantId": self.tenant_id,
             "roles": self._get_default_roles(),
             "uuid": f"{self.tenant_id}-prd",
-            "createdDate": datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
-            "lastModifiedDate": datetime.now().strftime("%d-%m-%Y %H:%M:%S"),
-            "dob": None,
-            "pwdExpiryDate": None
+            "createdDate": now,
+            "lastModifiedDate": now
         }
 
+        # One pooled session for all uploads so TCP/TLS connections get reused.
+        # Only connect errors are retried (with backoff): they happen before anything is sent.
+        # The ingestion POST is not idempotent, so it is never re-sent after a read error or a
+        # gateway status, as the upstream may already have ingested it.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                read=False,
+                status=False,
+                backoff_factor=0.5,
+                raise_on_status=False
+            )
+        )
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+        # The request metadata never changes after construction, so serialize it once,
+        # already encoded so requests can put it into the multipart body as-is
+        self._cached_payload = {"DHIS2IngestionRequest": _json_dumps({
+            "tenantId": self.tenant_id,
+            "dataType": "Users",
+            "requestInfo": {
+                "authToken": self.auth_token,
+                "userInfo": self.user_info
+            }
+        })}
+
     def _get_default_roles(self):
-        return [
-            {"code": "SUPERVISOR", "name": "Supervisor", "tenantId": self.tenant_id},
-            {"code": "DISTRICT_SUPERVISOR", "name": "District Supervisor", "tenantId": self.tenant_id},
-            {"code": "SYSTEM_ADMINISTRATOR", "name": "System Administrator", "tenantId": self.tenant_id},
-            {"code": "SUPERUSER", "name": "Super User", "tenantId": self.tenant_id},
-            {"code": "NATIONAL_SUPERVISOR", "name": "National Supervisor", "tenantId": self.tenant_id},
-            {"code": "DISTRIBUTOR", "name": "Distributor", "tenantId": self.tenant_id},
-            {"code": "WAREHOUSE_MANAGER", "name": "Warehouse Manager", "tenantId": self.tenant_id},
-            {"code": "REGISTRAR", "name": "Registrar", "tenantId": self.tenant_id},
-            {"code": "PROVINCIAL_SUPERVISOR", "name": "Provincial Supervisor", "tenantId": self.tenant_id}
-        ]
+        return [{"code": code, "name": name, "tenantId": self.tenant_id} for code, name in self._ROLE_TEMPLATES]
 
     def _build_payload(self):
-        return {
-            "DHIS2IngestionRequest": json.dumps({
-                "tenantId": self.tenant_id,
-                "dataType": "Users",
-                "requestInfo": {
-                    "authToken": self.auth_token,
-                    "userInfo": self.user_info
-                }
-            })
-        }
+        return self._cached_payload
 
     def _check_if_user_exists(self, response_text, status_code):
         """Check if the API error is about a user that already exists."""
-        exists_patterns = [
-            "already exists",
-            "already exist",
-            "duplicate",
-            "user exists",
-            "username already",
-            "conflict",
-            "err_hrms_user_exist",
-            "user_exist_mob",
-        ]
-
-        response_lower = response_text.lower()
-
-        if status_code == 409:
-            return True
-
-        return any(pattern in response_lower for pattern in exists_patterns)
+        return status_code == 409 or bool(self._EXISTS_RE.search(response_text))
 
     def _parse_api_response(self, response_text):
         """
@@ -106,13 +165,13 @@ class APIClient:
         The API sometimes returns HTTP 200 but has errors inside the JSON.
         """
         try:
-            data = json.loads(response_text)
+            data = _json_loads(response_text)
             job_status = data.get("jobStatus", "")
             errors = data.get("errors", [])
             response_status = data.get("ResponseInfo", {}).get("status", "")
 
             is_success = (
-                job_status in ["Completed", "Success"] or
+                job_status in self._SUCCESS_JOB_STATES or
                 (response_status == "Success" and not errors and job_status != "Partial Completed")
             )
 
@@ -132,14 +191,16 @@ class APIClient:
             }
 
     def _upload_to_endpoint(self, file_path, endpoint_url):
-        """Send the file to the API and return parsed result."""
+        """Send the file (path or file-like object) to the API and return parsed result."""
         payload = self._build_payload()
         headers = {'Accept': 'application/json'}
 
         try:
-            with open(file_path, 'rb') as f:
+            # In-memory buffers are sent as-is, paths are opened from disk
+            file_ctx = nullcontext(file_path) if hasattr(file_path, "read") else open(file_path, 'rb')
+            with file_ctx as f:
                 files = [('file', ('file', f, 'application/octet-stream'))]
-                response = requests.post(
+                response = self._session.post(
                     endpoint_url,
                     headers=headers,
                     data=payload,
@@ -147,7 +208,10 @@ class APIClient:
                     timeout=60
                 )
 
-            parsed = self._parse_api_response(response.text)
+            # The endpoint answers in JSON (UTF-8); skip charset sniffing over the whole body
+            response.encoding = response.encoding or 'utf-8'
+            response_text = response.text
+            parsed = self._parse_api_response(response_text)
 
             if response.status_code == 200 and parsed["success"]:
                 status = "SUCCESS"
@@ -156,15 +220,21 @@ class APIClient:
                 status = "ERROR"
 
             if parsed["errors"]:
-                error_msg = "; ".join(parsed["errors"]) if isinstance(parsed["errors"], list) else str(parsed["errors"])
+                error_msg = "; ".join(map(str, parsed["errors"])) if isinstance(parsed["errors"], list) else str(parsed["errors"])
+            else:
+                error_msg = response_text
+
+            if isinstance(parsed["errors"], list):
+                errors = parsed["errors"]
             else:
-                error_msg = response.text
+                errors = [parsed["errors"]] if parsed["errors"] else []
 
             return {
                 "status": status,
                 "status_code": response.status_code,
-                "message": error_msg if status == "ERROR" else response.text,
-                "job_status": parsed["job_status"]
+                "message": _truncate_message(error_msg if status == "ERROR" else response_text),
+                "job_status": parsed["job_status"],
+                "errors": errors
             }
 
         except requests.exceptions.Timeout:
@@ -172,32 +242,83 @@ class APIClient:
                 "status": "ERROR",
                 "status_code": 408,
                 "message": "Request timeout",
-                "job_status": ""
+                "job_status": "",
+                "errors": []
             }
         except requests.exceptions.RequestException as e:
             return {
                 "status": "ERROR",
                 "status_code": 500,
                 "message": str(e),
-                "job_status": ""
+                "job_status": "",
+                "errors": []
             }
         except Exception as e:
             return {
                 "status": "ERROR",
                 "status_code": 500,
                 "message": f"Unexpected error: {str(e)}",
-                "job_status": ""
+                "job_status": "",
+                "errors": []
             }
 
+    def _existing_user_message(self, message, status_code):
+        """Prefix messages about an already existing user so they stand out in the report."""
+        if self._check_if_user_exists(message, status_code):
+            return f"User already exists. {message}"
+        return message
+
     def upload_file(self, file_path):
-        """Upload a single CSV file. Returns SUCCESS or FAILED."""
+        """Upload a single CSV file (path or file-like object). Returns SUCCESS or FAILED."""
         result = self._upload_to_endpoint(file_path, self.api_url)
         if result["status"] == "SUCCESS":
             result["status"] = "SUCCESS"
         else:
             result["status"] = "FAILED"
-            if self._check_if_user_exists(result["message"], result["status_code"]):
-                result["message"] = f"User already exists. {result['message']}"
+            result["message"] = self._existing_user_message(result["message"], result["status_code"])
 
         return result
 
+    def upload_batch(self, file_path, usernames):
+        """
+        Upload a multi-row CSV file and attribute the outcome back to each row.
+        Returns one result dict per username, in the same order. When a failed batch
+        names some rows in its errors, the rows it does not name get None instead:
+        they were not rejected themselves and should be submitted again.
+        """
+        if len(usernames) == 1:
+            return [self.upload_file(file_path)]
+
+        result = self._upload_to_endpoint(file_path, self.api_url)
+        if result["status"] == "SUCCESS":
+            return [dict(result) for _ in usernames]
+        result["status"] = "FAILED"
+
+        # Errors that name a user belong to that row; anything else applies to the whole batch
+        row_errors = {username: [] for username in usernames}
+        name_patterns = {
+            username: re.compile(rf"(?<![\w.-]){re.escape(username)}(?![\w.-])")
+            for username in usernames if username
+        }
+        for error in result["errors"]:
+            error_text = str(error)
+            for username, pattern in name_patterns.items():
+                if pattern.search(error_text):
+                    row_errors[username].append(error_text)
+
+        named = any(row_errors.values())
+        # With a partial completion, rows the server didn't complain about went through
+        partial = result["job_status"] == "Partial Completed" and named
+
+        results = []
+        for username in usernames:
+            if row_errors[username]:
+                message = self._existing_user_message("; ".join(row_errors[username]), result["status_code"])
+                results.append({**result, "message": message})
+            elif partial:
+                results.append({**result, "status": "SUCCESS", "message": "Not listed in batch errors"})
+            elif named:
+                results.append(None)
+            else:
+                results.append(dict(result))
+        return results
@@ -6,6 +6,9 @@ import pandas as pd
 from datetime import datetime
 import re
 
+# Accepts both / and - separators
+_DATE_RE = re.compile(r"^(0[1-9]|[12][0-9]|3[01])[/-](0[1-9]|1[0-2])[/-][0-9]{4}$")
+
 
 def validate_roles(value, row, reference_data):
     """Check each role against the roles mapping file."""
@@ -28,6 +31,25 @@ def validate_roles(value, row, reference_data):
     return errors
 
 
+def validate_roles_column(values, df, reference_data):
+    """Column-wide validate_roles. Returns an error (or None) per row."""
+    errors = pd.Series(None, index=values.index, dtype=object)
+    roles_map = reference_data.get("roles", {})
+
+    if not roles_map:
+        return errors
+
+    valid_role_keys = frozenset(k for k, v in roles_map.items() if isinstance(v, str))
+
+    # One row per listed role, still labelled with the row it came from
+    roles = values[values.ne("")].str.split(",").explode().str.strip()
+    invalid = roles[~roles.isin(valid_role_keys)]
+    if not invalid.empty:
+        messages = "Invalid roles: " + invalid.groupby(level=0, sort=False).agg(", ".join)
+        errors[messages.index] = messages
+    return errors
+
+
 def validate_date_of_joining(value, row, reference_data):
     """Validate date format (DD/MM/YYYY or DD-MM-YYYY) and check it's a real date."""
     date_str = str(value).strip()
@@ -35,9 +57,7 @@ def validate_date_of_joining(value, row, reference_data):
     if date_str == "" or date_str.lower() == "nan" or pd.isna(value):
         return []  # Schema already handles required check
 
-    # Accepts both / and - separators
-    pattern = r"^(0[1-9]|[12][0-9]|3[01])[/-](0[1-9]|1[0-2])[/-][0-9]{4}$"
-    if not re.fullmatch(pattern, date_str):
+    if not _DATE_RE.fullmatch(date_str):
         return ["date_of_joining must be in DD/MM/YYYY or DD-MM-YYYY format"]
 
     try:
@@ -59,8 +79,7 @@ def validate_date_of_birth(value, row, reference_data):
         return []  # Optional field, schema handles format check
 
     # Only validate if format looks right (schema regex handles format errors)
-    pattern = r"^(0[1-9]|[12][0-9]|3[01])[/-](0[1-9]|1[0-2])[/-][0-9]{4}$"
-    if not re.fullmatch(pattern, date_str):
+    if not _DATE_RE.fullmatch(date_str):
         return []  # Schema pattern check will catch format issues
 
     try:
@@ -74,6 +93,39 @@ def validate_date_of_birth(value, row, reference_data):
             return [f"Invalid date_of_birth: {date_str} is not a real date"]
 
 
+def _parse_dates(values):
+    """
+    Return (well_formed, not_real) masks for a column of stripped date strings:
+    which cells match the DD/MM/YYYY or DD-MM-YYYY shape, and which of those
+    aren't real calendar dates under either separator.
+    """
+    well_formed = values.str.fullmatch(_DATE_RE).fillna(False).astype(bool)
+    candidates = values.where(well_formed)
+    slash = pd.to_datetime(candidates, format="%d/%m/%Y", errors="coerce")
+    dash = pd.to_datetime(candidates, format="%d-%m-%Y", errors="coerce")
+    return well_formed, well_formed & slash.isna() & dash.isna()
+
+
+def validate_date_of_joining_column(values, df, reference_data):
+    """Column-wide validate_date_of_joining. Returns an error (or None) per row."""
+    filled = values.ne("") & values.str.lower().ne("nan")
+    well_formed, not_real = _parse_dates(values)
+
+    errors = pd.Series(None, index=values.index, dtype=object)
+    errors[filled & ~well_formed] = "date_of_joining must be in DD/MM/YYYY or DD-MM-YYYY format"
+    errors[not_real] = "Invalid date_of_joining"
+    return errors
+
+
+def validate_date_of_birth_column(values, df, reference_data):
+    """Column-wide validate_date_of_birth. Returns an error (or None) per row."""
+    _, not_real = _parse_dates(values)
+
+    errors = pd.Series(None, index=values.index, dtype=object)
+    errors[not_real] = "Invalid date_of_birth: " + values[not_real] + " is not a real date"
+    return errors
+
+
 def validate_boundary(value, row, reference_data):
     """Make sure boundary_code and administrative_area match in boundary_template."""
     errors = []
@@ -82,13 +134,18 @@ def validate_boundary(value, row, reference_data):
     if not boundaries:
         return errors
 
+    # Prefer the precomputed name set; scanning boundaries.values() is O(V) per row
+    boundary_names = reference_data.get("boundary_names")
+    if boundary_names is None:
+        boundary_names = set(boundaries.values())
+
     boundary_code = str(value).strip()
     administrative_area = str(row.get("administrative_area", "")).strip()
 
     if boundary_code not in boundaries:
         errors.append(f"Invalid boundary_code: {boundary_code}")
 
-    if administrative_area not in boundaries.values():
+    if administrative_area not in boundary_names:
         errors.append(f"Invalid administrative_area: {administrative_area}")
 
     if not errors:
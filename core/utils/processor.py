@@ -3,10 +3,15 @@ CSV processing helpers and upload orchestration.
 Extracted from notebook cell-2.
 """
 
+import csv
+import io
+import logging
 import os
 import glob
 import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import ipywidgets as widgets
 from IPython.display import display
@@ -14,6 +19,12 @@ from IPython.display import display
 from core import create_user_validator
 from core.api_client import APIClient
 
+logger = logging.getLogger(__name__)
+
+DATE_COLUMNS = ('date_of_joining', 'date_of_birth')
+API_COLUMNS = ['api_status', 'api_status_code', 'api_message']
+SKIPPED_RESULT = ('SKIPPED', 'N/A', 'Validation failed')
+
 
 def clear_uploads_folder(exclude_file=None):
     """Remove old files from uploads/, keep the one we're about to process."""
@@ -41,11 +52,49 @@ def normalize_date(date_str):
     return str(date_str).strip().replace('-', '/')
 
 
-def normalize_row_dates(row):
-    for col in ['date_of_joining', 'date_of_birth']:
-        if col in row.index:
-            row[col] = normalize_date(row[col])
-    return row
+def build_csv(header, rows):
+    """Render a prepared header line plus rows of values as CSV bytes."""
+    buf = io.StringIO()
+    buf.write(header)
+    csv.writer(buf, lineterminator='\n').writerows(rows)
+    return buf.getvalue().encode()
+
+
+def write_error_rows(validated_path, report_path, chunk_size):
+    """Copy only the rows that failed validation into the error report, chunk by chunk."""
+    reader = pd.read_csv(validated_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    with open(report_path, 'w', newline='') as out_f:
+        for chunk_num, chunk in enumerate(reader):
+            chunk[chunk['validation_status'] == 'ERROR'].to_csv(out_f, index=False, header=chunk_num == 0)
+
+
+def write_ready_rows(writer, rows, results, cursor):
+    """
+    Write rows from `cursor` onwards whose results are already known, stopping at
+    the first pending one so the output keeps the input order. Returns the new cursor.
+    """
+    while cursor < len(rows) and rows[cursor][0] in results:
+        idx, _, values = rows[cursor]
+        writer.writerow(values + list(results[idx]))
+        cursor += 1
+    return cursor
+
+
+class RateLimiter:
+    """Spaces out calls across threads so at most one starts every `interval` seconds."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
 
 def cleanup_temp_files():
@@ -57,7 +106,9 @@ def cleanup_temp_files():
             pass
 
 
-def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=None):
+def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=None,
+                max_workers=4, upload_delay=5, chunk_size=10_000, batch_size=50,
+                validation_workers=None):
     """
     Run validation and upload flow on a CSV file.
 
@@ -68,6 +119,13 @@ def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=Non
         auth_token: Auth token string.
         log: Callable that accepts a string message for output.
         output_widget: Optional ipywidgets.Output to render the progress bar into.
+        max_workers: Number of uploads allowed in flight at once.
+        upload_delay: Minimum seconds between the start of two uploads.
+        chunk_size: Rows per chunk when streaming the CSV through validation and upload.
+            Streamed chunks are parsed with pandas' C parser; only the duplicate pre-pass
+            over the unique columns uses pyarrow.
+        batch_size: Rows sent to the API in each upload request.
+        validation_workers: Processes used to validate chunks in parallel; None validates serially.
 
     Returns:
         A summary_data dict describing the outcome.
@@ -111,7 +169,16 @@ def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=Non
         pct = int(current / total * 100)
         val_label.value = f"<b>Validating: {current}/{total} ({pct}%)</b>"
 
-    validated_df, summary = validator.validate_csv(upload_path, progress_callback=on_validate_progress)
+    # Stream validated rows to a side file so the whole CSV never sits in memory
+    base_name = uploaded_filename.rsplit('.', 1)[0]
+    validated_path = f"uploads/{base_name}_validated.csv"
+    _, summary = validator.validate_csv(
+        upload_path,
+        progress_callback=on_validate_progress,
+        output_path=validated_path,
+        chunksize=chunk_size,
+        max_workers=validation_workers
+    )
 
     # Mark validation complete
     if summary['error_users'] > 0 or summary['header_status'] == 'ERROR':
@@ -123,14 +190,13 @@ def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=Non
 
     if summary['error_users'] > 0 or summary['header_status'] == 'ERROR':
         # Validation failed
-        base_name = uploaded_filename.rsplit('.', 1)[0]
         error_report_path = f"uploads/{base_name}_errors.csv"
 
         if summary['error_users'] > 0:
-            error_df = validated_df[validated_df['validation_status'] == 'ERROR']
+            write_error_rows(validated_path, error_report_path, chunk_size)
+            os.remove(validated_path)
         else:
-            error_df = validated_df
-        error_df.to_csv(error_report_path, index=False)
+            os.replace(validated_path, error_report_path)
 
         error_label = summary['header_message'] if summary['header_status'] == 'ERROR' else f"{summary['error_users']} errors"
 
@@ -150,7 +216,7 @@ def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=Non
     log(f"[PHASE 2] API UPLOAD ")
     log(f"{'=' * 70}\n")
 
-    validated_df.to_csv(upload_path, index=False)
+    os.replace(validated_path, upload_path)
 
     log(f"[UPLOADING] User Data")
     log(f"   Total Users: {summary['total_users']}")
@@ -160,18 +226,12 @@ def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=Non
 
     client = APIClient(api_url, tenant_id, auth_token)
 
-    base_name = uploaded_filename.rsplit('.', 1)[0]
     final_report_path = f"uploads/{base_name}_result.csv"
 
-    df = pd.read_csv(upload_path)
-    df['api_status'] = ''
-    df['api_status_code'] = ''
-    df['api_message'] = ''
-
     success_count = 0
     failed_count = 0
     skipped_count = 0
-    total = len(df)
+    total = summary['total_users']
 
     # --- Progress bar ---
     progress_bar = widgets.IntProgress(
@@ -188,62 +248,110 @@ def process_csv(csv_path, api_url, tenant_id, auth_token, log, output_widget=Non
             display(progress_box)
 
     processed = 0
-
-    for idx, row in df.iterrows():
-        if row.get('validation_status') == 'CORRECT':
-            log(f"[PROCESSING] Row {idx + 1}/{total}: {row.get('username', 'N/A')}")
-
-            row_normalized = normalize_row_dates(row.copy())
-
-            temp_file = f"temp_upload_{idx}.csv"
-            single_row_df = pd.DataFrame([row_normalized])
-            single_row_df.to_csv(temp_file, index=False)
-
-            result = client.upload_file(temp_file)
-
-            df.at[idx, 'api_status'] = result['status']
-            df.at[idx, 'api_status_code'] = str(result['status_code'])
-            df.at[idx, 'api_message'] = result['message']
-
-            if result['status'] == 'SUCCESS':
-                success_count += 1
-                log(f" -> SUCCESS (Status: {result['status_code']})")
-            else:
-                failed_count += 1
-                log(f" -> FAILED (Status: {result['status_code']})")
-
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-
-            time.sleep(5)
-        else:
-            df.at[idx, 'api_status'] = 'SKIPPED'
-            df.at[idx, 'api_status_code'] = 'N/A'
-            df.at[idx, 'api_message'] = 'Validation failed'
-            skipped_count += 1
-
-        processed += 1
-        pct = int(processed / total * 100)
-        progress_bar.value = processed
-        progress_label.value = f"<b>Uploading: {processed}/{total} ({pct}%)</b>"
+    limiter = RateLimiter(upload_delay)
+
+    def upload_batch(header, batch):
+        """
+        Upload (idx, username, values) rows as one batch. Rows that a failed batch did not
+        reject are submitted again with the rest, until every row has its own outcome.
+        """
+        results = {}
+        pending = batch
+        while pending:
+            limiter.wait()
+            buf = io.BytesIO(build_csv(header, [values for _, _, values in pending]))
+            batch_results = client.upload_batch(buf, [username for _, username, _ in pending])
+            retry = []
+            for row, result in zip(pending, batch_results):
+                if result is None:
+                    retry.append(row)
+                else:
+                    results[row[0]] = result
+            pending = retry
+        return [results[idx] for idx, _, _ in batch]
+
+    # Stream the validated file in chunks so memory stays bounded by chunk_size,
+    # writing result rows out as soon as their upload outcome is known
+    reader = pd.read_csv(upload_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    with open(final_report_path, 'w', newline='', buffering=1 << 20) as out_f, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = csv.writer(out_f, lineterminator='\n')
+        rows_written = 0
+        last_flush = 0
+
+        for chunk_num, df in enumerate(reader):
+            cols = df.columns.tolist()
+            if chunk_num == 0:
+                writer.writerow(cols + API_COLUMNS)
+            date_positions = [i for i, col in enumerate(cols) if col in DATE_COLUMNS]
+            header = build_csv("", [cols]).decode()
+
+            # Rows that failed validation are never uploaded; stamp them in one go
+            correct_mask = df['validation_status'] == 'CORRECT'
+            results = dict.fromkeys(df.index[~correct_mask], SKIPPED_RESULT)
+            skipped_count += len(results)
+            processed += len(results)
+
+            rows = [(row.Index, getattr(row, 'username', 'N/A'), list(row[1:])) for row in df.itertuples(index=True)]
+
+            upload_rows = []
+            for idx, username, values in rows:
+                if idx in results:
+                    continue
+                upload_values = values.copy()
+                for pos in date_positions:
+                    upload_values[pos] = normalize_date(upload_values[pos])
+                upload_rows.append((idx, username, upload_values))
+
+            # Each batch CSV is built in memory (in upload_batch) instead of a temp file on disk
+            futures = {}
+            for start in range(0, len(upload_rows), batch_size):
+                batch = upload_rows[start:start + batch_size]
+                futures[executor.submit(upload_batch, header, batch)] = batch
+
+            cursor = write_ready_rows(writer, rows, results, 0)
+            rows_written += cursor
+            for future in as_completed(futures):
+                batch = futures[future]
+                for (idx, username, _), result in zip(batch, future.result()):
+                    results[idx] = (result['status'], str(result['status_code']), result['message'])
+
+                    # Per-row detail goes to the logger; only failures are echoed to the UI
+                    logger.info("Processing row %d/%d: %s -> %s (Status: %s)",
+                                idx + 1, total, username, result['status'], result['status_code'])
+                    if result['status'] == 'SUCCESS':
+                        success_count += 1
+                    else:
+                        failed_count += 1
+                        log(f"[FAILED] Row {idx + 1}/{total}: {username} (Status: {result['status_code']})")
+
+                    processed += 1
+                    pct = int(processed / total * 100)
+                    progress_bar.value = processed
+                    progress_label.value = f"<b>Uploading: {processed}/{total} ({pct}%)</b>"
+
+                new_cursor = write_ready_rows(writer, rows, results, cursor)
+                rows_written += new_cursor - cursor
+                cursor = new_cursor
+                if rows_written - last_flush >= 100:
+                    out_f.flush()
+                    last_flush = rows_written
 
     # Mark progress bar complete
     progress_bar.bar_style = 'success'
     progress_label.value = f"<b>Upload complete: {total}/{total} (100%)</b>"
 
-    df.to_csv(final_report_path, index=False)
-
     log(f"\n{'=' * 70}")
     log("[API UPLOAD SUMMARY]")
     log(f"{'=' * 70}")
-    log(f"[TOTAL UPLOADED] {len(df)}")
+    log(f"[TOTAL UPLOADED] {total}")
     log(f"[SUCCESS] {success_count}")
     log(f"[FAILED] {failed_count}")
     log(f"[SKIPPED] {skipped_count}")
     log(f"{'=' * 70}\n")
     log(f" Updating result file: {final_report_path}")
     log(f"    Result file updated successfully!")
-    log(f"    Updated {len(df)} rows\n")
+    log(f"    Updated {total} rows\n")
     log(" DATA UPLOAD COMPLETED!")
 
     return {
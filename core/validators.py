@@ -2,17 +2,69 @@
 Generic CSV validator using MDMS JSON Schema
 """
 
+import numpy as np
 import pandas as pd
 import re
 import json
+import itertools
+import math
+import multiprocessing
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import os
 
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
-class CSVValidator:
-    """Validates CSV files against an MDMS JSON schema. Supports custom validation hooks."""
+# Files at least this big are parsed with the multithreaded pyarrow engine
+PYARROW_MIN_BYTES = 1 << 20
+
+# Cell values that never count towards duplicate detection
+_EMPTY_SENTINELS = frozenset(("", "nan", "None"))
+
+# Everything needed to check one field, resolved from the schema once.
+# Unused checks are None; messages are pre-formatted.
+_FieldPlan = namedtuple("_FieldPlan", [
+    "required", "required_msg",
+    "pattern", "pattern_msg",
+    "enum_upper", "enum_msg",
+    "min_length", "min_length_msg",
+    "max_length", "max_length_msg",
+    "is_number", "number_msg",
+    "minimum", "minimum_msg",
+    "maximum", "maximum_msg",
+])
+
+# Per-process state for parallel chunk validation, set once by _init_chunk_worker
+_worker_validator = None
+_worker_duplicates = None
+
+
+def _init_chunk_worker(validator, duplicate_values):
+    global _worker_validator, _worker_duplicates
+    _worker_validator = validator
+    _worker_duplicates = duplicate_values
 
-    def __init__(self, schema_path=None, reference_data=None, custom_validators=None):
+
+def _validate_chunk(chunk):
+    """Clean and validate one raw chunk inside a worker process."""
+    df, stripped = _worker_validator._clean_frame(chunk)
+    return _worker_validator._validate_frame(df, stripped, _worker_duplicates)
+
+
+class CSVValidator:
+    """
+    Validates CSV files against an MDMS JSON schema. Supports custom validation hooks,
+    either per row (custom_validators) or over a whole column (column_validators).
+    A field with a column validator skips its per-row custom validator. Both kinds
+    receive cell values that are already stripped of surrounding whitespace.
+    """
+
+    def __init__(self, schema_path=None, reference_data=None, custom_validators=None, column_validators=None):
         if not schema_path:
             default_schema = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'user_validation_mdms_schema.json')
             schema_path = default_schema
@@ -29,15 +81,58 @@ class CSVValidator:
         self.unique_fields = self.schema.get("x-unique", [])
         self.properties = self.schema.get("properties", {})
         self.expected_cols = list(self.properties.keys())
+        self._expected_set = frozenset(self.expected_cols)
+
+        # Resolve each field's checks once instead of on every cell
+        self._plans = {name: self._build_plan(name, fs) for name, fs in self.properties.items()}
 
         self.reference_data = reference_data or {}
         self.custom_validators = custom_validators or {}
+        self.column_validators = column_validators or {}
+
+    def _build_plan(self, field_name, field_schema):
+        field_type = field_schema.get("type")
+        if isinstance(field_type, list):
+            # Handle nullable types like ["string", "null"]
+            field_type = [t for t in field_type if t != "null"][0]
+
+        pattern = re.compile(field_schema["pattern"]) if "pattern" in field_schema else None
+
+        enum_upper = enum_msg = None
+        if "enum" in field_schema:
+            allowed = [str(v) for v in field_schema["enum"] if v is not None and str(v)]
+            enum_upper = frozenset(v.upper() for v in allowed)
+            enum_msg = f"{field_name} must be one of: {allowed}"
+
+        min_length = field_schema.get("minLength")
+        max_length = field_schema.get("maxLength")
+        minimum = field_schema.get("minimum")
+        maximum = field_schema.get("maximum")
+
+        return _FieldPlan(
+            required=field_name in self.required_fields,
+            required_msg=f"{field_name} is required",
+            pattern=pattern,
+            pattern_msg=field_schema.get("description", f"Invalid {field_name}"),
+            enum_upper=enum_upper,
+            enum_msg=enum_msg,
+            min_length=min_length,
+            min_length_msg=f"{field_name} must be at least {min_length} characters",
+            max_length=max_length,
+            max_length_msg=f"{field_name} exceeds maximum length of {max_length}",
+            is_number=field_type == "number",
+            number_msg=f"{field_name} must be a number",
+            minimum=minimum,
+            minimum_msg=f"{field_name} must be >= {minimum}",
+            maximum=maximum,
+            maximum_msg=f"{field_name} must be <= {maximum}",
+        )
 
     def validate_headers(self, df):
         """Check if CSV headers match what the schema expects."""
-        csv_headers = list(df.columns)
-        missing = set(self.expected_cols) - set(csv_headers)
-        extra = set(csv_headers) - set(self.expected_cols)
+        csv_set = set(df.columns)
+        missing = self._expected_set - csv_set
+        extra = csv_set - self._expected_set
 
         if not missing and not extra:
             return "CORRECT", "Headers match schema. No issues."
@@ -53,147 +148,323 @@ class CSVValidator:
         """Validate a single field value against its schema definition."""
         errors = []
 
-        if field_name not in self.properties:
+        plan = self._plans.get(field_name)
+        if plan is None:
             return errors
 
-        field_schema = self.properties[field_name]
-        value_str = str(value).strip()
-
-        is_empty = value_str == "" or value_str.lower() == "nan" or pd.isna(value)
+        if isinstance(value, str):
+            # Cells read with dtype=str are never NA, so skip the pd.isna() call
+            value_str = value.strip()
+            is_empty = not value_str or value_str.lower() == "nan"
+        else:
+            value_str = str(value).strip()
+            is_empty = value_str == "" or value_str.lower() == "nan" or pd.isna(value)
 
         if is_empty:
-            if field_name in self.required_fields:
-                errors.append(f"{field_name} is required")
+            if plan.required:
+                errors.append(plan.required_msg)
             return errors
 
-        field_type = field_schema.get("type")
-        if isinstance(field_type, list):
-            # Handle nullable types like ["string", "null"]
-            if "null" in field_type and is_empty:
-                return errors
-            field_type = [t for t in field_type if t != "null"][0]
-
-        if "pattern" in field_schema:
-            pattern = field_schema["pattern"]
-            if not re.fullmatch(pattern, value_str):
-                errors.append(field_schema.get("description", f"Invalid {field_name}"))
+        # Stop at the first failing check; later ones add nothing for a malformed value
+        if plan.pattern is not None and not plan.pattern.fullmatch(value_str):
+            return [plan.pattern_msg]
 
-        if "enum" in field_schema:
-            allowed = [str(v) if v is not None else None for v in field_schema["enum"]]
-            if value_str.upper() not in [v.upper() if v else None for v in allowed if v]:
-                errors.append(f"{field_name} must be one of: {[v for v in allowed if v]}")
+        if plan.enum_upper is not None and value_str.upper() not in plan.enum_upper:
+            return [plan.enum_msg]
 
-        if "minLength" in field_schema and len(value_str) < field_schema["minLength"]:
-            errors.append(f"{field_name} must be at least {field_schema['minLength']} characters")
+        if plan.min_length is not None and len(value_str) < plan.min_length:
+            return [plan.min_length_msg]
 
-        if "maxLength" in field_schema and len(value_str) > field_schema["maxLength"]:
-            errors.append(f"{field_name} exceeds maximum length of {field_schema['maxLength']}")
+        if plan.max_length is not None and len(value_str) > plan.max_length:
+            return [plan.max_length_msg]
 
-        if field_type == "number":
+        if plan.is_number:
             try:
                 num_value = float(value_str)
-                if "minimum" in field_schema and num_value < field_schema["minimum"]:
-                    errors.append(f"{field_name} must be >= {field_schema['minimum']}")
-                if "maximum" in field_schema and num_value > field_schema["maximum"]:
-                    errors.append(f"{field_name} must be <= {field_schema['maximum']}")
             except ValueError:
-                errors.append(f"{field_name} must be a number")
+                return [plan.number_msg]
+            if plan.minimum is not None and num_value < plan.minimum:
+                return [plan.minimum_msg]
+            if plan.maximum is not None and num_value > plan.maximum:
+                return [plan.maximum_msg]
 
         return errors
 
+    def _validate_column(self, field_name, values):
+        """
+        Run the schema checks for a whole column at once.
+        `values` holds the stripped cell strings; returns (mask, message) pairs in the
+        same order validate_field_against_schema reports them.
+        """
+        checks = []
+        plan = self._plans[field_name]
+
+        empty = (values.eq("") | values.str.lower().eq("nan")).to_numpy()
+        if plan.required:
+            checks.append((empty, plan.required_msg))
+
+        # Failing tests for the filled cells, in the order validate_field_against_schema runs them
+        tests = []
+        if plan.pattern is not None:
+            tests.append((plan.pattern_msg, lambda v: ~v.str.fullmatch(plan.pattern).fillna(False).to_numpy(dtype=bool)))
+        if plan.enum_upper is not None:
+            tests.append((plan.enum_msg, lambda v: ~v.str.upper().isin(plan.enum_upper).to_numpy()))
+        if plan.min_length is not None:
+            tests.append((plan.min_length_msg, lambda v: (v.str.len() < plan.min_length).to_numpy()))
+        if plan.max_length is not None:
+            tests.append((plan.max_length_msg, lambda v: (v.str.len() > plan.max_length).to_numpy()))
+        if plan.is_number:
+            tests.append((plan.number_msg, lambda v: pd.to_numeric(v, errors="coerce").isna().to_numpy()))
+            if plan.minimum is not None:
+                tests.append((plan.minimum_msg, lambda v: (pd.to_numeric(v) < plan.minimum).to_numpy()))
+            if plan.maximum is not None:
+                tests.append((plan.maximum_msg, lambda v: (pd.to_numeric(v) > plan.maximum).to_numpy()))
+
+        # A cell drops out at its first failure, so later tests only see cells still passing
+        positions = np.flatnonzero(~empty)
+        values = values[~empty]
+        for message, failing in tests:
+            if not len(positions):
+                break
+            bad = failing(values)
+            if bad.any():
+                mask = np.zeros(len(empty), dtype=bool)
+                mask[positions[bad]] = True
+                checks.append((mask, message))
+                values = values[~bad]
+                positions = positions[~bad]
+
+        return checks
+
     def check_uniqueness(self, df, field_name):
         """Find duplicate values in a column (ignores blanks)."""
         if field_name not in df.columns:
             return set()
 
         values = df[field_name].astype(str).str.strip()
-        values = values[~values.isin(["", "nan", "None"])]
+        values = values[~values.isin(_EMPTY_SENTINELS)]
 
-        counts = values.value_counts()
-        return {val for val, count in counts.items() if count > 1}
+        return set(values[values.duplicated(keep=False)])
 
-    def validate_csv(self, csv_path, progress_callback=None):
-        """Run all validations on a CSV and return the DataFrame with status columns."""
-        try:
-            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
-        except UnicodeDecodeError:
-            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding='latin-1')
+    def _read_whole_csv(self, csv_path, **options):
+        """Read a whole CSV, using the pyarrow parser for large files when available."""
+        if HAS_PYARROW and isinstance(csv_path, str) and os.path.getsize(csv_path) >= PYARROW_MIN_BYTES:
+            try:
+                return pd.read_csv(csv_path, engine="pyarrow", **options)
+            except pd.errors.ParserError:
+                pass  # e.g. ragged rows, which only the C parser tolerates
+        return pd.read_csv(csv_path, **options)
+
+    def _read_csv(self, csv_path, encoding=None, chunksize=None):
+        """
+        Read every cell as a string and yield the data as DataFrames: the whole file at once
+        (using the pyarrow parser for large files when available) or chunks of `chunksize` rows.
+        Chunks always come from the C parser, as pandas' pyarrow engine cannot stream.
+        """
+        options = {"dtype": str, "keep_default_na": False, "na_filter": False, "encoding": encoding}
+        if chunksize:
+            yield from pd.read_csv(csv_path, chunksize=chunksize, **options)
+            return
+        yield self._read_whole_csv(csv_path, **options)
+
+    def _scan_unique_fields(self, csv_path, encoding=None):
+        """
+        Pre-pass for chunked validation: read only the unique-field columns to find values
+        duplicated anywhere in the file. Returns (duplicate_values, raw_row_count).
+        """
+        options = {"dtype": str, "keep_default_na": False, "na_filter": False, "encoding": encoding}
+        raw_cols = list(pd.read_csv(csv_path, nrows=0, **options).columns)
+        unique_cols = [c for c in raw_cols if c.strip() in self.unique_fields]
+
+        df = self._read_whole_csv(csv_path, usecols=unique_cols or raw_cols[:1], **options)
+        duplicate_values = {}
+        for col in unique_cols:
+            values = df[col].str.strip()
+            values = values[~values.isin(_EMPTY_SENTINELS)]
+            duplicate_values[col.strip()] = set(values[values.duplicated(keep=False)])
+        return duplicate_values, len(df)
+
+    def _clean_frame(self, df):
+        """Tidy headers, drop stale status columns and blank rows. Returns (df, stripped view)."""
         df.columns = df.columns.str.strip()
         status_cols = ['validation_status', 'validation_errors', 'api_status', 'api_status_code', 'api_message']
-        df.drop(columns=[c for c in status_cols if c in df.columns], inplace=True)
-        if not df.empty:
-            df = df[~df.apply(lambda row: all(str(v).strip() == '' for v in row), axis=1)]
-        df.reset_index(drop=True, inplace=True)
-
-        header_status, header_message = self.validate_headers(df)
-
-        # Find duplicates for unique fields
-        duplicate_values = {}
-        for field in self.unique_fields:
-            if field in df.columns:
-                duplicate_values[field] = self.check_uniqueness(df, field)
+        df = df.drop(columns=[c for c in status_cols if c in df.columns])
 
+        # Strip every column once; all checks work off this view
+        stripped = pd.DataFrame({col: df[col].str.strip() for col in df.columns}, index=df.index)
+        if not df.empty:
+            not_blank = ~stripped.eq('').all(axis=1)
+            df = df[not_blank]
+            stripped = stripped[not_blank]
+        return df.reset_index(drop=True), stripped.reset_index(drop=True)
+
+    def _validate_frame(self, df, stripped, duplicate_values=None, on_field_done=None):
+        """
+        Validate one cleaned frame and return it with status columns attached.
+        Duplicates are found within the frame unless `duplicate_values` (field -> set) is given.
+        """
         excluded_cols = {"validation_status", "validation_errors", "api_status", "api_status_code", "api_message"}
         csv_headers = [c for c in df.columns if c not in excluded_cols]
-        output_rows = []
-        final_headers = csv_headers + ["validation_status", "validation_errors"]
-        output_rows.append(final_headers)
-
-        correct_count = 0
-        error_count = 0
-
-        for idx, row in df.iterrows():
-            error_list = []
-
-            for field_name in csv_headers:
-                if field_name not in self.properties:
-                    continue
 
-                # Schema validation
-                field_errors = self.validate_field_against_schema(field_name, row[field_name])
-                error_list.extend(field_errors)
-
-                # Custom validator (if any)
-                if field_name in self.custom_validators:
-                    custom_errors = self.custom_validators[field_name](
-                        row[field_name], row, self.reference_data
-                    )
+        total = len(df)
+        error_lists = [[] for _ in range(total)]
+        fields = [f for f in csv_headers if f in self.properties]
+        row_validated = [f for f in fields if f in self.custom_validators and f not in self.column_validators]
+        records = None
+        if row_validated:
+            # Build the row dicts from plain column lists; to_dict("records") indexes the frame cell by cell
+            columns = list(stripped.columns)
+            records = [dict(zip(columns, row)) for row in zip(*(stripped[c].tolist() for c in columns))]
+
+        # Validate column by column; appending per field keeps each row's errors in field order
+        for done, field_name in enumerate(fields, start=1):
+            values = stripped[field_name]
+
+            # Schema validation
+            for mask, message in self._validate_column(field_name, values):
+                for i in np.flatnonzero(mask):
+                    error_lists[i].append(message)
+
+            # Custom validator (if any), preferring the whole-column variant
+            if field_name in self.column_validators:
+                column_errors = self.column_validators[field_name](values, df, self.reference_data).to_numpy()
+                for i in np.flatnonzero(pd.notna(column_errors)):
+                    error_lists[i].append(column_errors[i])
+            elif field_name in self.custom_validators:
+                validator = self.custom_validators[field_name]
+                for i, row in enumerate(records):
+                    custom_errors = validator(row[field_name], row, self.reference_data)
                     if custom_errors:
                         if isinstance(custom_errors, list):
-                            error_list.extend(custom_errors)
+                            error_lists[i].extend(custom_errors)
                         else:
-                            error_list.append(custom_errors)
+                            error_lists[i].append(custom_errors)
+
+            # Uniqueness check
+            if field_name in self.unique_fields:
+                if duplicate_values is None:
+                    dup_mask = values.duplicated(keep=False) & ~values.isin(_EMPTY_SENTINELS)
+                else:
+                    dup_mask = values.isin(duplicate_values.get(field_name, set()))
+                dup_mask = dup_mask.to_numpy()
+                for i, value in zip(np.flatnonzero(dup_mask), values[dup_mask].tolist()):
+                    error_lists[i].append(f"Duplicate {field_name}: {value}")
+
+            if on_field_done:
+                on_field_done(done, len(fields))
+
+        # Attach the status columns to the frame instead of rebuilding it row by row
+        status_arr = np.empty(total, dtype=object)
+        errors_arr = np.empty(total, dtype=object)
+        for i, error_list in enumerate(error_lists):
+            status_arr[i] = "ERROR" if error_list else "CORRECT"
+            errors_arr[i] = "; ".join(error_list)
+
+        return df[csv_headers].assign(validation_status=status_arr, validation_errors=errors_arr)
+
+    def validate_csv(self, csv_path, progress_callback=None, output_path=None, chunksize=None, max_workers=None):
+        """
+        Run all validations on a CSV and return the DataFrame with status columns.
+
+        With `chunksize`, the file is streamed in chunks of that many rows (plus one
+        pre-pass over the unique columns) so memory stays bounded, and `max_workers` > 1
+        spreads the chunks over that many processes. With `output_path`, validated rows
+        are written there as they are produced and None is returned in place of the DataFrame.
+        """
+        try:
+            return self._validate_file(csv_path, progress_callback, output_path, chunksize, max_workers)
+        except UnicodeDecodeError:
+            return self._validate_file(csv_path, progress_callback, output_path, chunksize, max_workers, encoding='latin-1')
+
+    def _validate_chunks(self, chunks, duplicate_values, progress_callback, raw_total):
+        """Validate chunks in this process, yielding (cleaned_frame, raw_row_count, validated_frame)."""
+        rows_read = 0
+        for chunk in chunks:
+            chunk_rows = len(chunk)
+            df, stripped = self._clean_frame(chunk)
+
+            def on_field_done(done, n_fields, base=rows_read, rows=chunk_rows):
+                progress_total = raw_total or rows
+                if progress_callback and progress_total:
+                    progress_callback(base + rows * done // n_fields, progress_total)
+
+            yield df, chunk_rows, self._validate_frame(df, stripped, duplicate_values, on_field_done)
+            rows_read += chunk_rows
+
+    def _validate_chunks_parallel(self, chunks, duplicate_values, progress_callback, raw_total, max_workers):
+        """
+        Validate chunks across worker processes, yielding the same tuples as _validate_chunks
+        in file order (the cleaned frame is header-only). At most 2 * max_workers chunks
+        are in flight, so memory stays bounded.
+        """
+        pending = deque()
+        rows_read = 0
+        chunks = iter(chunks)
+        # Spawn fresh workers rather than forking: the caller is often a multithreaded Jupyter kernel
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_chunk_worker, initargs=(self, duplicate_values)) as executor:
+            while True:
+                for chunk in itertools.islice(chunks, 2 * max_workers - len(pending)):
+                    header_df = self._clean_frame(chunk.iloc[:0])[0]
+                    pending.append((header_df, len(chunk), executor.submit(_validate_chunk, chunk)))
+                if not pending:
+                    break
+
+                header_df, chunk_rows, future = pending.popleft()
+                validated = future.result()
+                rows_read += chunk_rows
+                if progress_callback:
+                    progress_callback(rows_read, raw_total)
+                yield header_df, chunk_rows, validated
+
+    def _validate_file(self, csv_path, progress_callback, output_path, chunksize, max_workers=None, encoding=None):
+        duplicate_values, raw_total = None, None
+        if chunksize:
+            duplicate_values, raw_total = self._scan_unique_fields(csv_path, encoding)
+
+        chunks = self._read_csv(csv_path, encoding, chunksize)
+        # Worker processes only pay off when there is more than one chunk to share out
+        if chunksize and max_workers and max_workers > 1 and raw_total > chunksize:
+            max_workers = min(max_workers, math.ceil(raw_total / chunksize))
+            results = self._validate_chunks_parallel(chunks, duplicate_values, progress_callback, raw_total, max_workers)
+        else:
+            results = self._validate_chunks(chunks, duplicate_values, progress_callback, raw_total)
 
-                # Uniqueness check
-                if field_name in self.unique_fields:
-                    value = str(row[field_name]).strip()
-                    if value and value not in ["", "nan", "None"] and value in duplicate_values[field_name]:
-                        error_list.append(f"Duplicate {field_name}: {value}")
+        out_f = open(output_path, 'w', newline='', encoding='utf-8') if output_path else None
+        validated_chunks = []
+        header_status = header_message = None
+        total = correct_count = 0
 
-            status = "CORRECT" if not error_list else "ERROR"
+        try:
+            for chunk_num, (df, chunk_rows, validated) in enumerate(results):
+                if chunk_num == 0:
+                    header_status, header_message = self.validate_headers(df)
 
-            if status == "CORRECT":
-                correct_count += 1
-            else:
-                error_count += 1
+                total += len(validated)
+                correct_count += int((validated["validation_status"] == "CORRECT").sum())
 
-            row_data = [row[col] for col in csv_headers]
-            row_data.extend([status, str(error_list)])
-            output_rows.append(row_data)
+                if out_f:
+                    validated.to_csv(out_f, index=False, header=chunk_num == 0)
+                else:
+                    validated_chunks.append(validated)
+        finally:
+            if out_f:
+                out_f.close()
 
-            if progress_callback:
-                progress_callback(idx + 1, len(df))
+        error_count = total - correct_count
 
-        validated_df = pd.DataFrame(output_rows[1:], columns=output_rows[0])
+        validated_df = None
+        if not out_f:
+            validated_df = pd.concat(validated_chunks, ignore_index=True) if len(validated_chunks) > 1 else validated_chunks[0]
 
         summary = {
             "header_status": header_status,
             "header_message": header_message,
-            "total_rows": len(df),
+            "total_rows": total,
             "correct_rows": correct_count,
             "error_rows": error_count,
             # Aliases used by the notebook
-            "total_users": len(df),
+            "total_users": total,
             "correct_users": correct_count,
             "error_users": error_count
         }